@@ -2,8 +2,81 @@ from flask import Flask
 from config import Config
 from app.extensions import db, login_manager, migrate, socketio
 from datetime import datetime
+import atexit
 import logging.config
+import logging.handlers
 import os
+import queue
+
+# Background listeners that perform the actual log file writes, and the process running them
+_log_listeners = []
+_log_listeners_pid = None
+
+def configure_logging():
+    """
+    Apply LOGGING_CONFIG with file writes moved off the request path
+    
+    Each logger's FileHandlers are replaced by a RecordQueueHandler; a QueueListener
+    thread per logger drains the queue into the original handlers, which do the formatting.
+    """
+    global _log_listeners_pid
+    from app.utils.log_formatters import RecordQueueHandler
+    
+    if _log_listeners_pid == os.getpid():
+        for listener in _log_listeners:
+            listener.stop()
+    _log_listeners.clear()
+    _log_listeners_pid = os.getpid()
+    
+    logging.config.dictConfig(Config.LOGGING_CONFIG)
+    
+    logger_names = [None] + list(Config.LOGGING_CONFIG.get('loggers', {}))
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        file_handlers = [h for h in logger.handlers if isinstance(h, logging.FileHandler)]
+        if not file_handlers:
+            continue
+        
+        log_queue = queue.Queue(-1)
+        for handler in file_handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(RecordQueueHandler(log_queue))
+        
+        listener = logging.handlers.QueueListener(log_queue, *file_handlers, respect_handler_level=True)
+        listener.start()
+        _log_listeners.append(listener)
+
+def restart_log_listeners():
+    """
+    Start fresh QueueListener threads after fork()
+    
+    Threads don't survive fork(), so with a preloaded app (gunicorn preload_app) the
+    master's listeners are dead in each worker and nothing would drain the queues.
+    Call from post_fork; a no-op in the process that configured logging.
+    """
+    global _log_listeners_pid
+    if _log_listeners_pid in (None, os.getpid()):
+        return
+    
+    # The old listeners' threads are gone - don't stop() them, their sentinel would
+    # end the new listener reading the same queue
+    _log_listeners[:] = [
+        logging.handlers.QueueListener(
+            listener.queue, *listener.handlers, respect_handler_level=listener.respect_handler_level
+        )
+        for listener in _log_listeners
+    ]
+    _log_listeners_pid = os.getpid()
+    for listener in _log_listeners:
+        listener.start()
+
+@atexit.register
+def _stop_log_listeners():
+    """Flush queued log records on shutdown"""
+    if _log_listeners_pid != os.getpid():
+        return
+    for listener in _log_listeners:
+        listener.stop()
 
 def create_app():
     app = Flask(__name__)
@@ -11,7 +84,7 @@ def create_app():
     
     # Set up logging
     os.makedirs('logs', exist_ok=True)
-    logging.config.dictConfig(Config.LOGGING_CONFIG)
+    configure_logging()
     
     # Add template globals
     @app.template_global()
@@ -22,7 +95,9 @@ def create_app():
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
-    socketio.init_app(app)
+    # Fan Socket.IO emits out through Redis when configured so every worker
+    # (and scripts outside the server) reach all connected clients
+    socketio.init_app(app, message_queue=app.config.get('REDIS_URL'))
     
     # Configure login manager
     login_manager.login_view = 'auth.login'
@@ -98,8 +98,8 @@ class DonationPayment(db.Model):
                 type=payment_type,
                 sound_effect_id=sound_effect_id,
                 quickpay_invoice_id=invoice_result.get('invoice_id'),
-                quickpay_merchant_id=invoice_result.get('raw_response', {}).get('merchant_id'),
-                quickpay_terminal_id=invoice_result.get('raw_response', {}).get('terminal_id'),
+                quickpay_merchant_id=invoice_result.get('merchant_id'),
+                quickpay_terminal_id=invoice_result.get('terminal_id'),
                 webhook_token=invoice_result.get('webhook_token'),
                 callback_url=invoice_result.get('callback_url'),
                 qr_code=invoice_result.get('qr_code'),
@@ -1,6 +1,6 @@
 from app.extensions import db
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy import func, select
 
 class DonorLeaderboard(db.Model):
     """
@@ -97,7 +97,7 @@ class DonorLeaderboard(db.Model):
     
     @classmethod
     def get_top_donors(cls, streamer_id, limit=10):
-        """Get top N donors for streamer"""
+        """Get top N donors for streamer (served by idx_leaderboard range read)"""
         return cls.query.filter_by(user_id=streamer_id)\
                       .order_by(cls.total_amount.desc())\
                       .limit(limit).all()
@@ -106,21 +106,22 @@ class DonorLeaderboard(db.Model):
     def get_donor_position(cls, streamer_id, donor_name, donor_user_id=None):
         """Get donor's current position in leaderboard (1-based)"""
         # Always search by donor_name only (merged entries)
-        entry = cls.query.filter_by(
-            user_id=streamer_id,
-            donor_name=donor_name
-        ).first()
-        
-        if not entry:
-            return None
+        donor_amount = select(cls.total_amount).where(
+            cls.user_id == streamer_id,
+            cls.donor_name == donor_name
+        ).scalar_subquery()
         
-        # Count how many donors have higher total amounts
-        higher_count = cls.query.filter(
+        # Count how many donors have higher total amounts, in the same round-trip
+        higher_count = select(func.count(cls.id)).where(
             cls.user_id == streamer_id,
-            cls.total_amount > entry.total_amount
-        ).count()
+            cls.total_amount > donor_amount
+        ).scalar_subquery()
         
-        return higher_count + 1
+        amount, higher = db.session.execute(select(donor_amount, higher_count)).one()
+        if amount is None:
+            return None
+        
+        return higher + 1
     
     def check_position_change(self, old_amount):
         """Detect if donor position changed with new donation"""
@@ -1,6 +1,8 @@
 from app.extensions import db
 from datetime import datetime
-import json
+import copy
+import orjson
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 
 class DonorLeaderboardSettings(db.Model):
     """
@@ -39,125 +41,134 @@ class DonorLeaderboardSettings(db.Model):
         """Get or create settings for user"""
         settings = cls.query.filter_by(user_id=user_id).first()
         if not settings:
-            settings = cls(user_id=user_id)
-            settings._generate_overlay_token()
-            db.session.add(settings)
+            # Atomic insert-if-missing on unique_user_settings, so concurrent
+            # first requests for the same user can't race into a duplicate row
+            db.session.execute(
+                mysql_insert(cls).values(
+                    user_id=user_id,
+                    overlay_token=cls._new_overlay_token()
+                ).on_duplicate_key_update(user_id=user_id)
+            )
             db.session.commit()
+            settings = cls.query.filter_by(user_id=user_id).one()
         elif not settings.overlay_token:
             settings._generate_overlay_token()
             db.session.commit()
         return settings
     
-    def _generate_overlay_token(self):
-        """Generate a secure random token for overlay URL"""
+    @staticmethod
+    def _new_overlay_token():
+        """Create a secure random token for overlay URL"""
         import secrets
         import string
         
         # Generate 32-character random string
         alphabet = string.ascii_letters + string.digits
-        self.overlay_token = ''.join(secrets.choice(alphabet) for _ in range(32))
+        return ''.join(secrets.choice(alphabet) for _ in range(32))
+    
+    def _generate_overlay_token(self):
+        """Generate a secure random token for overlay URL"""
+        self.overlay_token = self._new_overlay_token()
     
     def regenerate_overlay_token(self):
         """Regenerate overlay token (for security purposes)"""
         self._generate_overlay_token()
         self.updated_at = datetime.utcnow()
     
-    def get_throne_styling(self):
-        """Get throne styling configuration"""
-        if self.throne_styling:
+    # Default styling per section, copied out so callers can modify the result
+    DEFAULT_THRONE_STYLING = {
+        'background_color': '#FFD700',  # Gold
+        'text_color': '#1A1A1A',
+        'border_color': '#FFA500',
+        'font_size': '1.4em',
+        'font_weight': 'bold',
+        'icon': 'crown',
+        'glow_effect': True,
+        'animation': 'pulse'
+    }
+    DEFAULT_PODIUM_STYLING = {
+        'background_color': '#C0C0C0',  # Silver
+        'text_color': '#1A1A1A',
+        'border_color': '#A0A0A0',
+        'font_size': '1.2em',
+        'font_weight': '600',
+        'icons': ['medal', 'medal'],  # Silver, Bronze
+        'colors': ['#C0C0C0', '#CD7F32'],  # Silver, Bronze
+        'animation': 'fade'
+    }
+    DEFAULT_STANDARD_STYLING = {
+        'background_color': '#404040',  # Dark gray instead of transparent
+        'text_color': '#FFFFFF',
+        'border_color': '#606060',  # Lighter gray for border
+        'font_size': '1em',
+        'font_weight': 'normal',
+        'animation': 'none'
+    }
+    DEFAULT_GLOBAL_STYLING = {
+        'font_family': 'Inter, sans-serif',
+        'background_transparency': 0.9,
+        'border_radius': '15px',
+        'padding': '20px',
+        'backdrop_filter': 'blur(20px)',
+        'container_background': 'rgba(255, 255, 255, 0.1)',
+        'container_border': 'rgba(255, 255, 255, 0.3)'
+    }
+    
+    def _get_styling(self, column, default):
+        """
+        Decode a styling column
+        
+        Args:
+            column: Name of the styling column
+            default: Styling returned when the column is empty or invalid
+            
+        Returns:
+            dict: Freshly decoded styling configuration, safe for callers to modify
+        """
+        raw = getattr(self, column)
+        if raw:
             try:
-                return json.loads(self.throne_styling)
-            except (json.JSONDecodeError, TypeError):
+                return orjson.loads(raw)
+            except (orjson.JSONDecodeError, TypeError):
                 pass
-        
-        # Default throne styling
-        return {
-            'background_color': '#FFD700',  # Gold
-            'text_color': '#1A1A1A',
-            'border_color': '#FFA500',
-            'font_size': '1.4em',
-            'font_weight': 'bold',
-            'icon': 'crown',
-            'glow_effect': True,
-            'animation': 'pulse'
-        }
+        return copy.deepcopy(default)
+    
+    def _set_styling(self, column, styling_dict):
+        """Encode a styling column"""
+        setattr(self, column, orjson.dumps(styling_dict).decode())
+        self.updated_at = datetime.utcnow()
+    
+    def get_throne_styling(self):
+        """Get throne styling configuration"""
+        return self._get_styling('throne_styling', self.DEFAULT_THRONE_STYLING)
     
     def get_podium_styling(self):
         """Get podium styling configuration"""
-        if self.podium_styling:
-            try:
-                return json.loads(self.podium_styling)
-            except (json.JSONDecodeError, TypeError):
-                pass
-        
-        # Default podium styling
-        return {
-            'background_color': '#C0C0C0',  # Silver
-            'text_color': '#1A1A1A',
-            'border_color': '#A0A0A0',
-            'font_size': '1.2em',
-            'font_weight': '600',
-            'icons': ['medal', 'medal'],  # Silver, Bronze
-            'colors': ['#C0C0C0', '#CD7F32'],  # Silver, Bronze
-            'animation': 'fade'
-        }
+        return self._get_styling('podium_styling', self.DEFAULT_PODIUM_STYLING)
     
     def get_standard_styling(self):
         """Get standard styling configuration"""
-        if self.standard_styling:
-            try:
-                return json.loads(self.standard_styling)
-            except (json.JSONDecodeError, TypeError):
-                pass
-        
-        # Default standard styling
-        return {
-            'background_color': '#404040',  # Dark gray instead of transparent
-            'text_color': '#FFFFFF',
-            'border_color': '#606060',  # Lighter gray for border
-            'font_size': '1em',
-            'font_weight': 'normal',
-            'animation': 'none'
-        }
+        return self._get_styling('standard_styling', self.DEFAULT_STANDARD_STYLING)
     
     def get_global_styling(self):
         """Get global styling configuration"""
-        if self.global_styling:
-            try:
-                return json.loads(self.global_styling)
-            except (json.JSONDecodeError, TypeError):
-                pass
-        
-        # Default global styling
-        return {
-            'font_family': 'Inter, sans-serif',
-            'background_transparency': 0.9,
-            'border_radius': '15px',
-            'padding': '20px',
-            'backdrop_filter': 'blur(20px)',
-            'container_background': 'rgba(255, 255, 255, 0.1)',
-            'container_border': 'rgba(255, 255, 255, 0.3)'
-        }
+        return self._get_styling('global_styling', self.DEFAULT_GLOBAL_STYLING)
     
     def set_throne_styling(self, styling_dict):
         """Set throne styling configuration"""
-        self.throne_styling = json.dumps(styling_dict)
-        self.updated_at = datetime.utcnow()
+        self._set_styling('throne_styling', styling_dict)
     
     def set_podium_styling(self, styling_dict):
         """Set podium styling configuration"""
-        self.podium_styling = json.dumps(styling_dict)
-        self.updated_at = datetime.utcnow()
+        self._set_styling('podium_styling', styling_dict)
     
     def set_standard_styling(self, styling_dict):
         """Set standard styling configuration"""
-        self.standard_styling = json.dumps(styling_dict)
-        self.updated_at = datetime.utcnow()
+        self._set_styling('standard_styling', styling_dict)
     
     def set_global_styling(self, styling_dict):
         """Set global styling configuration"""
-        self.global_styling = json.dumps(styling_dict)
-        self.updated_at = datetime.utcnow()
+        self._set_styling('global_styling', styling_dict)
     
     def update_settings(self, **kwargs):
         """Update settings with provided values"""
@@ -1,5 +1,5 @@
 from datetime import datetime
-import json
+import orjson
 from flask import url_for
 from app.extensions import db
 
@@ -31,14 +31,14 @@ class SoundEffect(db.Model):
         if not self.tags:
             return []
         try:
-            return json.loads(self.tags)
-        except (json.JSONDecodeError, TypeError):
+            return orjson.loads(self.tags)
+        except (orjson.JSONDecodeError, TypeError):
             return []
     
     def set_tags_list(self, tags_list):
         """Set tags from list to JSON string"""
         if isinstance(tags_list, list):
-            self.tags = json.dumps(tags_list)
+            self.tags = orjson.dumps(tags_list).decode()
         else:
             self.tags = None
     
@@ -1,6 +1,6 @@
 from app.extensions import db
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, case
 
 class TTSUsage(db.Model):
     __tablename__ = 'tts_usage'
@@ -69,6 +69,35 @@ class TTSUsage(db.Model):
             cls.created_at >= time_limit
         ).count()
     
+    @classmethod
+    def get_limit_snapshot(cls, user_id, recent_minutes=5):
+        """Get all usage counters needed for limit checks in a single query"""
+        now = datetime.utcnow()
+        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        start_of_month = start_of_day.replace(day=1)
+        recent_limit = now - timedelta(minutes=recent_minutes)
+        
+        is_today = (cls.created_at >= start_of_day) & (cls.success == True)
+        is_this_month = (cls.created_at >= start_of_month) & (cls.success == True)
+        
+        row = db.session.query(
+            func.sum(case((is_today, 1), else_=0)),
+            func.sum(case((is_this_month, 1), else_=0)),
+            func.sum(case((cls.created_at >= recent_limit, 1), else_=0))
+        ).filter(
+            cls.user_id == user_id,
+            cls.created_at >= min(start_of_month, recent_limit)
+        ).one()
+        
+        daily_requests, monthly_requests, recent_requests = (
+            int(value or 0) for value in row
+        )
+        return {
+            'daily_requests': daily_requests,
+            'monthly_requests': monthly_requests,
+            'recent_requests': recent_requests
+        }
+    
     @classmethod
     def log_usage(cls, user_id, request_type, character_count, voice_id, success=True, error_message=None, ip_address=None):
         """Log TTS usage"""
@@ -83,4 +112,10 @@ class TTSUsage(db.Model):
         )
         db.session.add(usage)
         db.session.commit()
-        return usage
\ No newline at end of file
+        return usage
+    
+    @classmethod
+    def bulk_log_usage(cls, records):
+        """Log many TTS usage records with a single bulk INSERT"""
+        db.session.bulk_insert_mappings(cls, records)
+        db.session.commit()
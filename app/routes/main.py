@@ -58,6 +58,7 @@ def marathon_rate_limit(max_calls=60, window_minutes=1):
 
 def generate_tts_audio(user_id, text, voice, speed, pitch, request_type='donation'):
     """Generate TTS audio and return public URL"""
+    limiter = None
     try:
         from app.utils.chimege_tts import ChimegeTTS
         from app.utils.tts_limiter import TTSLimiter
@@ -128,6 +129,10 @@ def generate_tts_audio(user_id, text, voice, speed, pitch, request_type='donatio
     except Exception as e:
         current_app.logger.error(f"TTS GENERATION: Exception: {str(e)}")
         return None
+    finally:
+        # Give back quota reserved by check_limits if the request was never logged
+        if limiter:
+            limiter.release_reservation()
 
 @main_bp.route('/')
 def home():
@@ -12,6 +12,7 @@ tts_bp = Blueprint('tts', __name__)
 @login_required
 def synthesize_tts():
     """Synthesize text to speech using Chimege TTS"""
+    limiter = None
     try:
         current_app.logger.info("TTS SYNTHESIZE: Request received")
         data = request.get_json()
@@ -30,6 +31,12 @@ def synthesize_tts():
         current_app.logger.info(f"TTS SYNTHESIZE: User {current_user.id} requesting TTS")
         current_app.logger.info(f"TTS SYNTHESIZE: Text='{text}', Voice={voice}, Speed={speed}, Pitch={pitch}, Type={request_type}")
         
+        # Validate text length before reserving quota
+        if len(text) < 2:
+            return jsonify({'error': 'Text too short'}), 400
+        if len(text) > 300:
+            text = text[:300]
+        
         # Initialize limiter
         limiter = TTSLimiter(current_user)
         current_app.logger.info("TTS SYNTHESIZE: Checking usage limits")
@@ -54,12 +61,6 @@ def synthesize_tts():
                 'usage_info': limit_check['usage_info']
             }), 429  # Too Many Requests
         
-        # Validate text length
-        if len(text) < 2:
-            return jsonify({'error': 'Text too short'}), 400
-        if len(text) > 300:
-            text = text[:300]
-        
         # Initialize TTS client
         current_app.logger.info("TTS SYNTHESIZE: Initializing Chimege TTS client")
         tts = ChimegeTTS()
@@ -109,6 +110,10 @@ def synthesize_tts():
     except Exception as e:
         current_app.logger.error(f"TTS SYNTHESIZE: Exception occurred: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
+    finally:
+        # Give back quota reserved by check_limits if the request was never logged
+        if limiter:
+            limiter.release_reservation()
 
 @tts_bp.route('/api/tts/voices', methods=['GET'])
 @login_required
@@ -126,6 +131,7 @@ def get_voices():
 @login_required
 def test_tts():
     """Test TTS with sample text"""
+    limiter = None
     try:
         current_app.logger.info("TTS TEST: Test request received")
         data = request.get_json()
@@ -198,6 +204,10 @@ def test_tts():
     except Exception as e:
         logging.error(f"TTS test error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
+    finally:
+        # Give back quota reserved by check_limits if the request was never logged
+        if limiter:
+            limiter.release_reservation()
 
 @tts_bp.route('/api/tts/usage', methods=['GET'])
 @login_required
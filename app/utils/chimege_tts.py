@@ -2,11 +2,16 @@ import requests
 import os
 import tempfile
 import uuid
+import hashlib
 import logging
 try:
     from flask import current_app
 except ImportError:
     current_app = None
+from app.utils.redis_client import get_redis
+
+# Synthesized audio is cached in Redis so repeated messages skip the Chimege API
+AUDIO_CACHE_TTL = 86400  # 24 hours
 
 
 class ChimegeTTS:
@@ -37,7 +42,7 @@ class ChimegeTTS:
         else:
             print(f"CHIMEGE TTS ERROR: {message}")
         
-    def synthesize_text(self, text, voice_id="FEMALE3v2", speed=1.0, pitch=1.0, sample_rate=22050):
+    def synthesize_text(self, text, voice_id="FEMALE3v2", speed=1.0, pitch=1.0, sample_rate=22050, disable_cache=False):
         """
         Convert text to speech using Chimege API
         
@@ -47,6 +52,7 @@ class ChimegeTTS:
             speed (float): Speech speed (0.2-4.0)
             pitch (float): Voice pitch (0.2-6.0)
             sample_rate (int): Audio sample rate (8000, 16000, 22050)
+            disable_cache (bool): Always call the API, bypassing the audio cache
             
         Returns:
             str: Path to generated audio file, or None if failed
@@ -64,6 +70,13 @@ class ChimegeTTS:
             self._log_warning("Text too long, truncating to 300 characters")
             text = text[:300]
             
+        redis_client = None if disable_cache else get_redis()
+        cache_key = self._audio_cache_key(text, voice_id, speed, pitch, sample_rate)
+        cached_audio = self._get_cached_audio(redis_client, cache_key)
+        if cached_audio:
+            self._log_info(f"Audio cache hit for text: '{text}'")
+            return self._save_audio(cached_audio)
+            
         try:
             # Prepare request
             url = f"{self.base_url}/synthesize"
@@ -92,12 +105,8 @@ class ChimegeTTS:
             self._log_info(f"API response headers: {dict(response.headers)}")
             
             if response.status_code == 200:
-                # Save audio to temporary file
-                audio_filename = f"tts_{uuid.uuid4().hex}.wav"
-                audio_path = os.path.join(tempfile.gettempdir(), audio_filename)
-                
-                with open(audio_path, 'wb') as f:
-                    f.write(response.content)
+                audio_path = self._save_audio(response.content)
+                self._cache_audio(redis_client, cache_key, response.content)
                 
                 self._log_info(f"TTS generated: {audio_path}")
                 return audio_path
@@ -114,6 +123,40 @@ class ChimegeTTS:
             self._log_error(f"TTS generation failed: {str(e)}")
             return None
             
+    def _save_audio(self, audio_data):
+        """Save audio to temporary file and return its path"""
+        audio_filename = f"tts_{uuid.uuid4().hex}.wav"
+        audio_path = os.path.join(tempfile.gettempdir(), audio_filename)
+        
+        with open(audio_path, 'wb') as f:
+            f.write(audio_data)
+        
+        return audio_path
+    
+    def _audio_cache_key(self, text, voice_id, speed, pitch, sample_rate):
+        """Build Redis key for synthesized audio"""
+        digest = hashlib.sha256(f"{voice_id}|{speed}|{pitch}|{sample_rate}|{text}".encode('utf-8')).hexdigest()
+        return f"tts:audio:{digest}"
+    
+    def _get_cached_audio(self, redis_client, cache_key):
+        """Get cached audio bytes, or None on miss/Redis failure"""
+        if not redis_client:
+            return None
+        try:
+            return redis_client.get(cache_key)
+        except Exception as e:
+            self._log_warning(f"Audio cache lookup failed: {str(e)}")
+            return None
+    
+    def _cache_audio(self, redis_client, cache_key, audio_data):
+        """Store synthesized audio bytes in Redis"""
+        if not redis_client:
+            return
+        try:
+            redis_client.setex(cache_key, AUDIO_CACHE_TTL, audio_data)
+        except Exception as e:
+            self._log_warning(f"Audio cache store failed: {str(e)}")
+            
     def normalize_text(self, text):
         """
         Normalize text for better TTS pronunciation
@@ -0,0 +1,49 @@
+"""
+Logging Formatters for DonAlert
+JSON log formatter used by the file handlers in Config.LOGGING_CONFIG, and the
+queue handler that hands records to those file handlers unformatted
+"""
+
+import copy
+import logging
+import logging.handlers
+import orjson
+
+
+class JSONFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': record.created,
+            'lvl': record.levelname,
+            'mod': record.module,
+            'msg': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Traceback pre-rendered by RecordQueueHandler
+            entry['exc'] = record.exc_text
+        return orjson.dumps(entry).decode()
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener's handlers
+    
+    The stock prepare() formats the record with this handler's formatter and
+    folds the traceback into msg, so JSONFormatter would never see it. Here only
+    the message arguments are merged and the traceback is kept in exc_text.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
@@ -6,12 +6,86 @@ Handles authentication, invoice creation, and payment processing for subscriptio
 import os
 import requests
 import base64
+import hashlib
+import hmac
 import json
+import logging
+import orjson
+import random
+import socket
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
-from flask import current_app, url_for
+from flask import url_for
+from sqlalchemy.orm import load_only
 from app.models.user import User
 from app.models.subscription import Subscription
 from app.extensions import db
+from app.utils.redis_client import get_redis
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Retry policy for transient upstream errors (network blips, 429 and 5xx)
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+AUTH_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_MAX = 30
+
+# (connect, read) timeouts - fail fast on an unreachable host, allow slow responses
+DEFAULT_TIMEOUT = (
+    int(os.getenv('QPAY_CONNECT_TIMEOUT', 5)),
+    int(os.getenv('QPAY_READ_TIMEOUT', 25))
+)
+
+# Shared token cache (Redis) settings
+TOKEN_EXPIRY_MARGIN = 300  # Refresh tokens 5 minutes before they expire
+TOKEN_LOCK_TIMEOUT = 10  # How long other workers wait for the refreshing worker
+# Refresh lock outlives the worst-case auth: every attempt timing out, each
+# followed by the longest backoff sleep
+TOKEN_LOCK_TTL = AUTH_MAX_ATTEMPTS * (sum(DEFAULT_TIMEOUT) + RETRY_BACKOFF_MAX)
+
+# Public host for callback URLs. When configured the URLs are built once instead
+# of via url_for per invoice; otherwise url_for is used, with DEFAULT_SERVER_NAME
+# as the fallback outside a request context
+SERVER_NAME = os.getenv('SERVER_NAME')
+DEFAULT_SERVER_NAME = 'donalert.invictamotus.com'
+SUBSCRIPTION_CALLBACK_URL = f"https://{SERVER_NAME}/subscription/callback" if SERVER_NAME else None
+DONATION_CALLBACK_URL = f"https://{SERVER_NAME}/donation/callback" if SERVER_NAME else None
+
+# Invoice requests repeated within this many seconds share an Idempotency-Key
+IDEMPOTENCY_WINDOW = 60
+
+# User columns needed by User.get_display_name()
+DISPLAY_NAME_COLUMNS = (User.username, User.first_name, User.last_name, User.display_name)
+
+# Subscription tier names shown in invoice descriptions
+TIER_DISPLAY_NAMES = {
+    'basic': 'Үндсэн',
+    'advanced': 'Дэвшилтэт'
+}
+
+class CappedRetry(Retry):
+    """Retry whose Retry-After sleeps are capped like the backoff (urllib3's backoff_max doesn't apply to them)"""
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, RETRY_BACKOFF_MAX)
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled sockets use TCP keep-alive (on top of urllib3's TCP_NODELAY)"""
+    
+    SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    ]
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = self.SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
 
 class QuickPayClient:
     """QuickPay API client for subscription payment processing"""
@@ -26,39 +100,165 @@ class QuickPayClient:
         self.bank_code = os.getenv('BANK_CODE')
         self.bank_account_name = os.getenv('BANK_ACCOUNT_NAME')
         
+        # Basic Auth header - credentials are fixed for the process lifetime
+        credentials = f"{self.username}:{self.password}"
+        self._basic_auth = f"Basic {base64.b64encode(credentials.encode()).decode()}"
+        
         # Current token will be managed in-memory for now
         self.current_token = None
         self.token_expires_at = None
+        self._token_lock = threading.Lock()
+        
+        # Shared session so every QuickPay call reuses pooled keep-alive connections
+        self.session = requests.Session()
+        adapter = KeepAliveHTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=CappedRetry(
+                total=4,
+                read=0,  # A read timeout may follow a created invoice - never resend the POST
+                backoff_factor=0.5,
+                status_forcelist=RETRY_STATUS_CODES,
+                allowed_methods=["GET", "POST"],
+                respect_retry_after_header=True,
+                backoff_max=RETRY_BACKOFF_MAX,
+                raise_on_status=False  # Hand the final non-200 back to the status checks below
+            )
+        )
+        self.session.mount("https://", adapter)
+        
+        # Auth calls retry only in _post_with_backoff, so the adapter must not retry as well
+        self.auth_session = requests.Session()
+        self.auth_session.mount("https://", KeepAliveHTTPAdapter(max_retries=0))
     
     def get_valid_token(self):
         """
-        Get valid access token with simple in-memory management
+        Get valid access token
+        Checks the in-memory token first, then the token shared by all workers in Redis,
+        and only authenticates when neither is valid
         Returns valid access token or None if authentication fails
         """
         try:
-            # Check if we have a valid token
-            if (self.current_token and self.token_expires_at and 
-                datetime.now() < self.token_expires_at - timedelta(minutes=5)):
+            if self._has_valid_token():
                 return self.current_token
             
-            # Need to authenticate
-            return self._authenticate()
+            # One refresh per process; other threads wait and reuse its token
+            with self._token_lock:
+                if self._has_valid_token():
+                    return self.current_token
+                return self._refresh_token()
             
         except Exception as e:
-            current_app.logger.error(f"QuickPay token management error: {str(e)}")
+            logger.error(f"QuickPay token management error: {str(e)}")
+            return self._authenticate()
+    
+    def _has_valid_token(self):
+        """Check if the in-memory token is valid and not about to expire"""
+        return bool(self.current_token and self.token_expires_at and
+                    datetime.now() < self.token_expires_at - timedelta(seconds=TOKEN_EXPIRY_MARGIN))
+    
+    def _refresh_token(self):
+        """Get token shared via Redis, or authenticate (one worker at a time)"""
+        redis_client = get_redis()
+        if not redis_client:
             return self._authenticate()
+        
+        token = self._get_shared_token(redis_client)
+        if token:
+            return token
+        
+        # Only one worker refreshes the token; the others wait for it to land in Redis
+        lock_key = f"{self._token_cache_key}:lock"
+        if redis_client.set(lock_key, "1", nx=True, ex=TOKEN_LOCK_TTL):
+            try:
+                return self._authenticate()
+            finally:
+                redis_client.delete(lock_key)
+        
+        for _ in range(TOKEN_LOCK_TIMEOUT * 2):
+            time.sleep(0.5)
+            token = self._get_shared_token(redis_client)
+            if token:
+                return token
+        
+        return self._authenticate()
+    
+    @property
+    def _token_cache_key(self):
+        return f"quickpay:token:{self.terminal_id}"
+    
+    def _get_shared_token(self, redis_client):
+        """Load token cached in Redis by any worker into the in-memory cache"""
+        pipe = redis_client.pipeline()
+        pipe.get(self._token_cache_key)
+        pipe.ttl(self._token_cache_key)
+        token, ttl = pipe.execute()
+        if not token or ttl is None or ttl <= 0:
+            return None
+        
+        self.current_token = token.decode() if isinstance(token, bytes) else token
+        # Redis TTL already excludes the refresh margin, add it back for the local check
+        self.token_expires_at = datetime.now() + timedelta(seconds=ttl + TOKEN_EXPIRY_MARGIN)
+        return self.current_token
+    
+    def _store_shared_token(self, expires_in):
+        """Share freshly issued token with other workers via Redis"""
+        redis_client = get_redis()
+        ttl = int(expires_in) - TOKEN_EXPIRY_MARGIN
+        if not redis_client or ttl <= 0:
+            return
+        
+        try:
+            redis_client.setex(self._token_cache_key, ttl, self.current_token)
+        except Exception as e:
+            logger.warning(f"QuickPay: Failed to cache token in Redis: {str(e)}")
+    
+    def _post_with_backoff(self, url, max_attempts=AUTH_MAX_ATTEMPTS, **kwargs):
+        """
+        POST with exponential backoff and jitter, at most max_attempts requests in total
+        
+        Used for the auth endpoint, where a failed call blocks every other request.
+        Goes through auth_session, whose adapter does not retry on its own.
+        Returns the last response, or re-raises the last network error.
+        """
+        response = None
+        for attempt in range(max_attempts):
+            response = None
+            try:
+                response = self.auth_session.post(url, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == max_attempts - 1:
+                    raise
+            
+            if attempt < max_attempts - 1:
+                # Honor the upstream's Retry-After when it tells us how long to wait
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = random.uniform(2, 4) * (attempt + 1)
+                logger.warning(f"QuickPay: Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_attempts})")
+                time.sleep(delay)
+        
+        return response
+    
+    @staticmethod
+    def _retry_after(response):
+        """Get Retry-After delay in seconds (capped), or None if not provided"""
+        if response is None:
+            return None
+        try:
+            return min(float(response.headers.get('Retry-After')), RETRY_BACKOFF_MAX)
+        except (TypeError, ValueError):
+            return None
     
     def _authenticate(self):
         """Perform authentication and get new token"""
         try:
             url = f"{self.base_url}/v2/auth/token"
             
-            # Basic Auth credentials
-            credentials = f"{self.username}:{self.password}"
-            encoded_credentials = base64.b64encode(credentials.encode()).decode()
-            
             headers = {
-                'Authorization': f'Basic {encoded_credentials}',
+                'Authorization': self._basic_auth,
                 'Content-Type': 'application/json'
             }
             
@@ -66,34 +266,52 @@ class QuickPayClient:
                 "terminal_id": self.terminal_id
             }
             
-            current_app.logger.info("QuickPay: Authenticating...")
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            logger.info("QuickPay: Authenticating...")
+            response = self._post_with_backoff(url, headers=headers, data=orjson.dumps(payload), timeout=DEFAULT_TIMEOUT)
             
             if response.status_code == 200:
-                token_data = response.json()
+                token_data = orjson.loads(response.content)
                 self.current_token = token_data['access_token']
                 expires_in = token_data.get('expires_in', 3600)
                 self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+                self._store_shared_token(expires_in)
                 
-                current_app.logger.info("QuickPay: Authentication successful")
+                logger.info("QuickPay: Authentication successful")
                 return self.current_token
             else:
-                current_app.logger.error(f"QuickPay authentication failed: {response.status_code} - {response.text}")
+                logger.error(f"QuickPay authentication failed: {response.status_code} - {response.text}")
                 return None
                 
         except requests.exceptions.RequestException as e:
-            current_app.logger.error(f"QuickPay authentication network error: {str(e)}")
+            logger.error(f"QuickPay authentication network error: {str(e)}")
             return None
         except Exception as e:
-            current_app.logger.error(f"QuickPay authentication error: {str(e)}")
+            logger.error(f"QuickPay authentication error: {str(e)}")
             return None
     
+    @staticmethod
+    def _idempotency_key(*parts):
+        """
+        Build Idempotency-Key header value for an invoice request
+        
+        Uses only the request's stable inputs plus the current IDEMPOTENCY_WINDOW, so a
+        caller retrying the same purchase shortly after sends the same key.
+        """
+        window = int(time.time()) // IDEMPOTENCY_WINDOW
+        return hashlib.sha256(":".join(str(part) for part in (*parts, window)).encode()).hexdigest()
+    
+    @staticmethod
+    def _webhook_token(idempotency_key):
+        """Secret callback token derived from the Idempotency-Key, so a deduplicated invoice's callback still matches"""
+        digest = hmac.new(Config.SECRET_KEY.encode(), idempotency_key.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+    
     def ensure_authenticated(self):
         """Ensure we have a valid access token"""
         token = self.get_valid_token()
         return token is not None
     
-    def create_subscription_invoice(self, user_id, tier, months=1):
+    def create_subscription_invoice(self, user_id, tier, months=1, include_raw=False):
         """
         Create QuickPay invoice for subscription payment
         
@@ -101,6 +319,7 @@ class QuickPayClient:
             user_id: ID of the user
             tier: Subscription tier ('basic', 'advanced')
             months: Number of months (default 1)
+            include_raw: Include the full upstream response as 'raw_response'
             
         Returns:
             dict: Invoice response or error dict
@@ -112,7 +331,7 @@ class QuickPayClient:
                 return {"error": "Authentication failed", "success": False}
             
             # Get user information
-            user = User.query.get(user_id)
+            user = db.session.get(User, user_id, options=[load_only(*DISPLAY_NAME_COLUMNS)])
             if not user:
                 return {"error": "User not found", "success": False}
             
@@ -125,34 +344,23 @@ class QuickPayClient:
             customer_name = user.get_display_name() or f"User {user_id}"
             
             # Create description
-            tier_names = {
-                'basic': 'Үндсэн',
-                'advanced': 'Дэвшилтэт'
-            }
-            tier_display = tier_names.get(tier, tier)
-            
-            if months == 1:
-                description = f"DonAlert - {tier_display} багц (1 сар)"
-            elif months == 3:
-                description = f"DonAlert - {tier_display} багц (3 сар)"
-            elif months == 6:
-                description = f"DonAlert - {tier_display} багц (6 сар)"
-            elif months == 12:
-                description = f"DonAlert - {tier_display} багц (12 сар)"
-            else:
-                description = f"DonAlert - {tier_display} багц ({months} сар)"
+            description = f"DonAlert - {TIER_DISPLAY_NAMES.get(tier, tier)} багц ({months} сар)"
+            
+            # Same key on every retry of this purchase so the upstream can drop duplicates
+            idempotency_key = self._idempotency_key(user_id, tier, months)
             
             # Create secure callback URL
-            import secrets
-            webhook_token = secrets.token_urlsafe(32)
+            webhook_token = self._webhook_token(idempotency_key)
             
-            # Create callback URL
-            try:
-                callback_url = url_for('main.subscription_callback', token=webhook_token, _external=True)
-            except (RuntimeError, Exception):
-                # Fallback for when not in request context
-                server_name = os.getenv('SERVER_NAME', 'donalert.invictamotus.com')
-                callback_url = f"https://{server_name}/subscription/callback?token={webhook_token}"
+            # Create callback URL (prebuilt base when a server name is configured)
+            if SUBSCRIPTION_CALLBACK_URL:
+                callback_url = f"{SUBSCRIPTION_CALLBACK_URL}?token={webhook_token}"
+            else:
+                try:
+                    callback_url = url_for('main.subscription_callback', token=webhook_token, _external=True)
+                except RuntimeError:
+                    # Fallback for when not in request context
+                    callback_url = f"https://{DEFAULT_SERVER_NAME}/subscription/callback?token={webhook_token}"
             
             # Extract account number from IBAN (last 10 digits)
             account_number = self.bank_iban[-10:] if self.bank_iban else "1205284753"
@@ -185,16 +393,17 @@ class QuickPayClient:
             url = f"{self.base_url}/v2/invoice"
             headers = {
                 'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Idempotency-Key': idempotency_key
             }
             
-            current_app.logger.info(f"QuickPay: Creating subscription invoice for user {user_id}, tier: {tier}, months: {months}, amount: {subscription_cost}")
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            logger.info(f"QuickPay: Creating subscription invoice for user {user_id}, tier: {tier}, months: {months}, amount: {subscription_cost}")
+            response = self.session.post(url, headers=headers, data=orjson.dumps(payload), timeout=DEFAULT_TIMEOUT)
             
             if response.status_code == 200:
-                invoice_data = response.json()
+                invoice_data = orjson.loads(response.content)
                 
-                current_app.logger.info(f"QuickPay: Subscription invoice created successfully - ID: {invoice_data.get('id')}")
+                logger.info(f"QuickPay: Subscription invoice created successfully - ID: {invoice_data.get('id')}")
                 
                 # Prepare response data
                 response_data = {
@@ -212,12 +421,16 @@ class QuickPayClient:
                     "tier": tier,
                     "months": months,
                     "callback_url": callback_url,
-                    "raw_response": invoice_data
+                    "merchant_id": invoice_data.get('merchant_id'),
+                    "terminal_id": invoice_data.get('terminal_id')
                 }
+                # The raw response repeats the base64 QR image; only keep it on request
+                if include_raw:
+                    response_data["raw_response"] = invoice_data
                 
                 return response_data
             else:
-                current_app.logger.error(f"QuickPay subscription invoice creation failed: {response.status_code} - {response.text}")
+                logger.error(f"QuickPay subscription invoice creation failed: {response.status_code} - {response.text}")
                 return {
                     "error": f"Invoice creation failed: {response.status_code}",
                     "success": False,
@@ -225,7 +438,7 @@ class QuickPayClient:
                 }
                 
         except Exception as e:
-            current_app.logger.error(f"QuickPay subscription invoice creation error: {str(e)}")
+            logger.error(f"QuickPay subscription invoice creation error: {str(e)}")
             return {
                 "error": f"Invoice creation error: {str(e)}",
                 "success": False
@@ -256,18 +469,18 @@ class QuickPayClient:
                 "invoice_id": invoice_id
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = self.session.post(url, headers=headers, data=orjson.dumps(payload), timeout=DEFAULT_TIMEOUT)
             
             if response.status_code == 200:
-                payment_data = response.json()
-                current_app.logger.info(f"QuickPay: Payment status check successful for invoice {invoice_id}")
+                payment_data = orjson.loads(response.content)
+                logger.info(f"QuickPay: Payment status check successful for invoice {invoice_id}")
                 return {"success": True, "data": payment_data}
             else:
-                current_app.logger.error(f"QuickPay payment check failed: {response.status_code} - {response.text}")
+                logger.error(f"QuickPay payment check failed: {response.status_code} - {response.text}")
                 return {"error": f"Payment check failed: {response.status_code}", "success": False}
                 
         except Exception as e:
-            current_app.logger.error(f"QuickPay payment status check error: {str(e)}")
+            logger.error(f"QuickPay payment status check error: {str(e)}")
             return {"error": f"Payment check error: {str(e)}", "success": False}
     
     def get_invoice_details(self, invoice_id):
@@ -291,21 +504,21 @@ class QuickPayClient:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
             
             if response.status_code == 200:
-                invoice_data = response.json()
-                current_app.logger.info(f"QuickPay: Invoice details retrieved for {invoice_id}")
+                invoice_data = orjson.loads(response.content)
+                logger.info(f"QuickPay: Invoice details retrieved for {invoice_id}")
                 return {"success": True, "data": invoice_data}
             else:
-                current_app.logger.error(f"QuickPay invoice details failed: {response.status_code} - {response.text}")
+                logger.error(f"QuickPay invoice details failed: {response.status_code} - {response.text}")
                 return {"error": f"Invoice details failed: {response.status_code}", "success": False}
                 
         except Exception as e:
-            current_app.logger.error(f"QuickPay invoice details error: {str(e)}")
+            logger.error(f"QuickPay invoice details error: {str(e)}")
             return {"error": f"Invoice details error: {str(e)}", "success": False}
     
-    def create_donation_invoice(self, streamer_user_id, donor_name, amount, message=""):
+    def create_donation_invoice(self, streamer_user_id, donor_name, amount, message="", include_raw=False):
         """
         Create QuickPay invoice for donation payment using streamer's bank account
         
@@ -314,6 +527,7 @@ class QuickPayClient:
             donor_name: Name of the donor
             amount: Donation amount in MNT
             message: Optional donation message
+            include_raw: Include the full upstream response as 'raw_response'
             
         Returns:
             dict: Invoice response or error dict
@@ -325,7 +539,9 @@ class QuickPayClient:
                 return {"error": "Authentication failed", "success": False}
             
             # Get streamer information
-            streamer = User.query.get(streamer_user_id)
+            streamer = db.session.get(User, streamer_user_id, options=[
+                load_only(*DISPLAY_NAME_COLUMNS, User.bank_iban, User.bank_code, User.bank_account_name)
+            ])
             if not streamer:
                 return {"error": "Streamer not found", "success": False}
             
@@ -347,17 +563,21 @@ class QuickPayClient:
             else:
                 description = f"Donation to {streamer_name}"
             
+            # Same key on every retry of this donation so the upstream can drop duplicates
+            idempotency_key = self._idempotency_key(streamer_user_id, donor_name, amount, message)
+            
             # Create secure callback URL
-            import secrets
-            webhook_token = secrets.token_urlsafe(32)
+            webhook_token = self._webhook_token(idempotency_key)
             
-            # Create callback URL
-            try:
-                callback_url = url_for('main.donation_callback', token=webhook_token, _external=True)
-            except (RuntimeError, Exception):
-                # Fallback for when not in request context
-                server_name = os.getenv('SERVER_NAME', 'donalert.invictamotus.com')
-                callback_url = f"https://{server_name}/donation/callback?token={webhook_token}"
+            # Create callback URL (prebuilt base when a server name is configured)
+            if DONATION_CALLBACK_URL:
+                callback_url = f"{DONATION_CALLBACK_URL}?token={webhook_token}"
+            else:
+                try:
+                    callback_url = url_for('main.donation_callback', token=webhook_token, _external=True)
+                except RuntimeError:
+                    # Fallback for when not in request context
+                    callback_url = f"https://{DEFAULT_SERVER_NAME}/donation/callback?token={webhook_token}"
             
             # Extract account number from streamer's IBAN (last 10 digits)
             account_number = streamer.bank_iban[-10:] if streamer.bank_iban else ""
@@ -390,16 +610,17 @@ class QuickPayClient:
             url = f"{self.base_url}/v2/invoice"
             headers = {
                 'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Idempotency-Key': idempotency_key
             }
             
-            current_app.logger.info(f"QuickPay: Creating donation invoice for streamer {streamer_user_id}, amount: {amount}")
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            logger.info(f"QuickPay: Creating donation invoice for streamer {streamer_user_id}, amount: {amount}")
+            response = self.session.post(url, headers=headers, data=orjson.dumps(payload), timeout=DEFAULT_TIMEOUT)
             
             if response.status_code == 200:
-                invoice_data = response.json()
+                invoice_data = orjson.loads(response.content)
                 
-                current_app.logger.info(f"QuickPay: Donation invoice created successfully - ID: {invoice_data.get('id')}")
+                logger.info(f"QuickPay: Donation invoice created successfully - ID: {invoice_data.get('id')}")
                 
                 # Prepare response data
                 response_data = {
@@ -418,12 +639,16 @@ class QuickPayClient:
                     "streamer_id": streamer_user_id,
                     "donor_name": donor_name,
                     "message": message,
-                    "raw_response": invoice_data
+                    "merchant_id": invoice_data.get('merchant_id'),
+                    "terminal_id": invoice_data.get('terminal_id')
                 }
+                # The raw response repeats the base64 QR image; only keep it on request
+                if include_raw:
+                    response_data["raw_response"] = invoice_data
                 
                 return response_data
             else:
-                current_app.logger.error(f"QuickPay donation invoice creation failed: {response.status_code} - {response.text}")
+                logger.error(f"QuickPay donation invoice creation failed: {response.status_code} - {response.text}")
                 return {
                     "error": f"Invoice creation failed: {response.status_code}",
                     "success": False,
@@ -431,7 +656,7 @@ class QuickPayClient:
                 }
                 
         except Exception as e:
-            current_app.logger.error(f"QuickPay donation invoice creation error: {str(e)}")
+            logger.error(f"QuickPay donation invoice creation error: {str(e)}")
             return {
                 "error": f"Invoice creation error: {str(e)}",
                 "success": False
@@ -0,0 +1,47 @@
+"""
+Redis Client Utility for DonAlert
+Provides a shared, pooled Redis connection for caches and counters shared across workers
+"""
+
+import logging
+from config import Config
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Lazily created client shared by every caller in this process
+_client = None
+
+
+def get_redis():
+    """
+    Get shared Redis client
+
+    Returns:
+        redis.Redis: Client backed by a connection pool, or None when Redis is
+        not configured/installed so callers can fall back to the database
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+
+    if redis is None or not Config.REDIS_URL:
+        return None
+
+    try:
+        pool = redis.ConnectionPool.from_url(
+            Config.REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+        _client = redis.Redis(connection_pool=pool)
+    except Exception as e:
+        logger.error(f"Redis client initialization error: {str(e)}")
+        return None
+
+    return _client
@@ -1,7 +1,13 @@
 from functools import wraps
-from flask import redirect, url_for, flash, request
+from flask import redirect, url_for, flash, request, g
 from flask_login import current_user
 
+def get_subscription_status():
+    """Get current user's subscription status, computed once per request"""
+    if 'subscription_status' not in g:
+        g.subscription_status = current_user.get_subscription_status()
+    return g.subscription_status
+
 def subscription_required(f):
     """Decorator to require an active subscription"""
     @wraps(f)
@@ -10,7 +16,7 @@ def subscription_required(f):
             flash('Нэвтрэх шаардлагатай', 'error')
             return redirect(url_for('auth.login'))
         
-        if not current_user.has_active_subscription():
+        if not get_subscription_status()['is_active']:
             flash('Үйлчилгээ ашиглахын тулд багц худалдан авна уу', 'error')
             return redirect(url_for('subscription.plans'))
         
@@ -25,7 +31,7 @@ def trial_or_subscription_required(f):
             flash('Нэвтрэх шаардлагатай', 'error')
             return redirect(url_for('auth.login'))
         
-        subscription_status = current_user.get_subscription_status()
+        subscription_status = get_subscription_status()
         
         if not subscription_status['is_active']:
             if subscription_status['is_expired']:
@@ -54,9 +60,19 @@ def admin_required(f):
     return decorated_function
 
 def check_subscription_status():
-    """Middleware function to check subscription status on each request"""
+    """
+    Middleware function to check subscription status on each request
+    
+    Register with `blueprint.before_request` on page-serving blueprints only,
+    not `app.before_request`, so static files and API calls skip it entirely.
+    """
+    # Static files (app or blueprint) and unmatched URLs never need subscription info
+    endpoint = request.endpoint
+    if endpoint is None or endpoint == 'static' or endpoint.endswith('.static'):
+        return
+    
     if current_user.is_authenticated:
-        subscription_status = current_user.get_subscription_status()
+        subscription_status = get_subscription_status()
         
         # Add subscription info to request context
         request.subscription_status = subscription_status
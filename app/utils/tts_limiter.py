@@ -1,6 +1,129 @@
 from app.models.tts_usage import TTSUsage
-from flask import request
+from app.extensions import db
+from app.utils.redis_client import get_redis
+from flask import request, current_app, g, has_app_context
+from datetime import datetime, timedelta
+import atexit
+import calendar
 import os
+import queue
+import threading
+import time
+import uuid
+
+# With Redis holding the limit counters, usage records are queued and bulk-inserted
+# by a background writer so logging never blocks the request; at most
+# USAGE_FLUSH_INTERVAL seconds of records are in flight
+USAGE_QUEUE_SIZE = 10000
+USAGE_BATCH_SIZE = 100
+USAGE_FLUSH_INTERVAL = 1.0
+USAGE_SHUTDOWN_TIMEOUT = 5.0
+
+_usage_queue = queue.Queue(maxsize=USAGE_QUEUE_SIZE)
+_usage_writer_lock = threading.Lock()
+_usage_writer_thread = None
+
+def _write_usage_batch(app, batch):
+    """Insert a batch of queued usage records"""
+    with app.app_context():
+        try:
+            TTSUsage.bulk_log_usage(batch)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"TTS LIMITER: Failed to write {len(batch)} usage records: {str(e)}")
+
+def _usage_writer(app):
+    """Background loop collecting up to USAGE_BATCH_SIZE records per insert until a None sentinel"""
+    running = True
+    while running:
+        batch = []
+        deadline = None
+        while len(batch) < USAGE_BATCH_SIZE:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                record = _usage_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if record is None:
+                running = False
+                break
+            batch.append(record)
+            if deadline is None:
+                deadline = time.monotonic() + USAGE_FLUSH_INTERVAL
+        if batch:
+            _write_usage_batch(app, batch)
+
+def _ensure_usage_writer():
+    """Start the background writer for the current app (once per process)"""
+    global _usage_writer_thread
+    if _usage_writer_thread is not None:
+        return
+    with _usage_writer_lock:
+        if _usage_writer_thread is None:
+            thread = threading.Thread(target=_usage_writer, args=(current_app._get_current_object(),), daemon=True)
+            thread.start()
+            _usage_writer_thread = thread
+
+@atexit.register
+def _stop_usage_writer():
+    """Let the writer finish its current batch and drain the queue at shutdown"""
+    if _usage_writer_thread is None:
+        return
+    try:
+        _usage_queue.put(None, timeout=USAGE_SHUTDOWN_TIMEOUT)
+    except queue.Full:
+        return
+    _usage_writer_thread.join(USAGE_SHUTDOWN_TIMEOUT)
+
+# Sliding-window rate limit: drop entries older than the window, then atomically
+# check the remaining count and record this request if under the limit
+RATE_LIMIT_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+if redis.call('ZCARD', key) >= limit then
+    return 0
+end
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('EXPIRE', key, math.ceil(window))
+return 1
+"""
+
+# Atomically reserve one request against the daily and monthly counters,
+# undoing the increments if either limit would be exceeded. Returns 2 when a
+# counter is missing - it must be seeded from the database, not started at 1
+RESERVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 or redis.call('EXISTS', KEYS[2]) == 0 then
+    return 2
+end
+if redis.call('INCR', KEYS[1]) > tonumber(ARGV[1]) then
+    redis.call('DECR', KEYS[1])
+    return 0
+end
+if redis.call('INCR', KEYS[2]) > tonumber(ARGV[2]) then
+    redis.call('DECR', KEYS[1])
+    redis.call('DECR', KEYS[2])
+    return -1
+end
+redis.call('EXPIREAT', KEYS[1], ARGV[3])
+redis.call('EXPIREAT', KEYS[2], ARGV[4])
+return 1
+"""
+
+# Adjust the day/month counters by ARGV[1], skipping keys that don't exist so a
+# counter is never created from zero while the database already holds usage
+ADJUST_COUNTERS_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('INCRBY', key, ARGV[1])
+    end
+end
+return 1
+"""
 
 class TTSLimiter:
     """TTS usage limiter and rate controller"""
@@ -9,39 +132,68 @@ class TTSLimiter:
     DEFAULT_DAILY_REQUESTS = 15
     DEFAULT_MONTHLY_REQUESTS = 450
     DEFAULT_TEST_DAILY_LIMIT = 3  # test requests per day
+    DEFAULT_RATE_LIMIT_REQUESTS = 0  # requests per rate limit window (Redis only, 0 = disabled)
+    RATE_LIMIT_WINDOW = 300  # seconds
+    DEFAULT_BURST_REQUESTS = 20  # requests per burst window (Redis only)
+    BURST_WINDOW = 10  # seconds
+    
+    # Base limits, read from the environment once at import
+    BASE_DAILY_REQUESTS = int(os.environ.get('TTS_DAILY_REQUESTS', DEFAULT_DAILY_REQUESTS))
+    BASE_MONTHLY_REQUESTS = int(os.environ.get('TTS_MONTHLY_REQUESTS', DEFAULT_MONTHLY_REQUESTS))
+    TEST_DAILY_LIMIT = int(os.environ.get('TTS_TEST_DAILY_LIMIT', DEFAULT_TEST_DAILY_LIMIT))
+    RATE_LIMIT_REQUESTS = int(os.environ.get('TTS_RATE_LIMIT_REQUESTS', DEFAULT_RATE_LIMIT_REQUESTS))
+    BURST_REQUESTS = int(os.environ.get('TTS_BURST_REQUESTS', DEFAULT_BURST_REQUESTS))
+    
+    # Registered Lua scripts, shared by all limiter instances
+    _rate_limit_script = None
+    _reserve_script = None
+    _adjust_counters_script = None
     
     # Advanced tier multiplier
     ADVANCED_TIER_MULTIPLIER = 3
     
+    # Redis counters expire at the end of the period they count (plus grace, seconds)
+    COUNTER_EXPIRY_GRACE = 3600
+    
     def __init__(self, user=None):
-        # Get base limits from environment variables
-        base_daily_requests = int(os.environ.get('TTS_DAILY_REQUESTS', self.DEFAULT_DAILY_REQUESTS))
-        base_monthly_requests = int(os.environ.get('TTS_MONTHLY_REQUESTS', self.DEFAULT_MONTHLY_REQUESTS))
+        # User id whose request check_limits has already counted in Redis (None if not reserved)
+        self._reserved = None
         
         # Check if user has advanced tier subscription
-        is_advanced_user = False
-        if user:
-            try:
-                subscription = user.get_current_subscription()
-                is_advanced_user = (subscription and 
-                                   subscription.feature_tier and 
-                                   subscription.feature_tier.value == 'advanced')
-            except Exception:
-                # If subscription check fails, default to basic tier
-                is_advanced_user = False
+        is_advanced_user = self._is_advanced_user(user) if user else False
         
         # Apply multiplier for advanced tier users
         multiplier = self.ADVANCED_TIER_MULTIPLIER if is_advanced_user else 1
         
-        self.daily_requests = base_daily_requests * multiplier
-        self.monthly_requests = base_monthly_requests * multiplier
+        self.daily_requests = self.BASE_DAILY_REQUESTS * multiplier
+        self.monthly_requests = self.BASE_MONTHLY_REQUESTS * multiplier
         
-        # Test limits don't scale with tier
-        self.test_daily_limit = int(os.environ.get('TTS_TEST_DAILY_LIMIT', self.DEFAULT_TEST_DAILY_LIMIT))
+        # Test and rate limits don't scale with tier
+        self.test_daily_limit = self.TEST_DAILY_LIMIT
+        self.rate_limit_requests = self.RATE_LIMIT_REQUESTS
         
         # Store user tier for display purposes
         self.user_tier = 'advanced' if is_advanced_user else 'basic'
     
+    @staticmethod
+    def _is_advanced_user(user):
+        """Check user's subscription tier, cached on g for the current request"""
+        tier_cache = g.setdefault('_tts_tier_cache', {}) if has_app_context() else {}
+        if user.id in tier_cache:
+            return tier_cache[user.id]
+        
+        try:
+            subscription = user.get_current_subscription()
+            is_advanced_user = bool(subscription and 
+                                    subscription.feature_tier and 
+                                    subscription.feature_tier.value == 'advanced')
+        except Exception:
+            # If subscription check fails, default to basic tier (not cached)
+            return False
+        
+        tier_cache[user.id] = is_advanced_user
+        return is_advanced_user
+    
     def check_limits(self, user_id, text, request_type='donation'):
         """
         Check if user can make TTS request
@@ -49,9 +201,23 @@ class TTSLimiter:
         Returns:
             dict: {'allowed': bool, 'reason': str, 'usage_info': dict}
         """
-        # Get current usage
-        daily_requests = TTSUsage.get_user_usage_today(user_id)
-        monthly_requests = TTSUsage.get_user_usage_this_month(user_id)
+        # Local copies of the limits used below
+        test_daily_limit = self.test_daily_limit
+        daily_limit = self.daily_requests
+        monthly_limit = self.monthly_requests
+        
+        # Reject floods before touching usage counters
+        if not self._check_burst(user_id):
+            return {
+                'allowed': False,
+                'reason': f'Too many requests ({self.BURST_REQUESTS} requests per {self.BURST_WINDOW} seconds).',
+                'usage_info': {}
+            }
+        
+        # Get current usage (single round trip for all counters)
+        snapshot = self._get_usage_snapshot(user_id)
+        daily_requests = snapshot['daily_requests']
+        monthly_requests = snapshot['monthly_requests']
         usage_info = {
             'daily_requests': daily_requests,
             'monthly_requests': monthly_requests
@@ -60,33 +226,57 @@ class TTSLimiter:
         # No character limits - Chimege only has request limits
         
         # Rate limiting removed for live streaming donations - streamers can get multiple donations rapidly
+        # (TTS_RATE_LIMIT_REQUESTS can opt in to a sliding-window limit, checked last)
         
         # Special limits for test requests
         if request_type == 'test':
-            if daily_requests >= self.test_daily_limit:
+            if daily_requests >= test_daily_limit:
                 return {
                     'allowed': False,
-                    'reason': f'Daily test limit reached ({self.test_daily_limit} tests per day).',
+                    'reason': f'Daily test limit reached ({test_daily_limit} tests per day).',
                     'usage_info': usage_info
                 }
         
         # Check daily limits
-        if daily_requests >= self.daily_requests:
+        if daily_requests >= daily_limit:
             return {
                 'allowed': False,
-                'reason': f'Daily request limit reached ({self.daily_requests} requests per day).',
+                'reason': f'Daily request limit reached ({daily_limit} requests per day).',
                 'usage_info': usage_info
             }
         
         
         # Check monthly limits
-        if monthly_requests >= self.monthly_requests:
+        if monthly_requests >= monthly_limit:
+            return {
+                'allowed': False,
+                'reason': f'Monthly request limit reached ({monthly_limit} requests per month).',
+                'usage_info': usage_info
+            }
+        
+        # Check rate limit
+        if not self._check_rate_limit(user_id):
             return {
                 'allowed': False,
-                'reason': f'Monthly request limit reached ({self.monthly_requests} requests per month).',
+                'reason': f'Too many requests ({self.rate_limit_requests} requests per {self.RATE_LIMIT_WINDOW // 60} minutes).',
                 'usage_info': usage_info
             }
         
+        # Count the request atomically so concurrent requests can't both take the last slot
+        effective_daily_limit = min(daily_limit, test_daily_limit) if request_type == 'test' else daily_limit
+        reserved = self._reserve_request(user_id, effective_daily_limit, monthly_limit)
+        if reserved == 0:
+            return {
+                'allowed': False,
+                'reason': f'Daily request limit reached ({effective_daily_limit} requests per day).',
+                'usage_info': usage_info
+            }
+        if reserved == -1:
+            return {
+                'allowed': False,
+                'reason': f'Monthly request limit reached ({monthly_limit} requests per month).',
+                'usage_info': usage_info
+            }
         
         return {
             'allowed': True,
@@ -95,28 +285,235 @@ class TTSLimiter:
         }
     
     def log_request(self, user_id, text, voice_id, request_type='donation', success=True, error_message=None):
-        """Log TTS request"""
+        """Log TTS request (queued for a background bulk insert when Redis holds the counters)"""
         ip_address = request.remote_addr if request else None
-        return TTSUsage.log_usage(
-            user_id=user_id,
-            request_type=request_type,
-            character_count=0,  # Character counting disabled - Chimege only limits requests
-            voice_id=voice_id,
-            success=success,
-            error_message=error_message,
-            ip_address=ip_address
-        )
+        if self._reserved is not None:
+            # Already counted by check_limits; give the slot back if the request failed
+            self._reserved = None
+            self._increment_counters(user_id, success, release=not success)
+        else:
+            self._increment_counters(user_id, success)
+        fields = {
+            'user_id': user_id,
+            'request_type': request_type,
+            'character_count': 0,  # Character counting disabled - Chimege only limits requests
+            'voice_id': voice_id,
+            'success': success,
+            'error_message': error_message,
+            'ip_address': ip_address
+        }
+        
+        # Without Redis the limits are checked against these rows, so they must be written now
+        if get_redis() is None:
+            return TTSUsage.log_usage(**fields)
+        
+        record = dict(fields, created_at=datetime.utcnow())
+        try:
+            _ensure_usage_writer()
+            _usage_queue.put_nowait(record)
+            return TTSUsage(**record)
+        except queue.Full:
+            # Writer is falling behind - log synchronously rather than drop the record
+            return TTSUsage.log_usage(**fields)
+    
+    def release_reservation(self):
+        """
+        Give back the quota slot reserved by check_limits
+        
+        Call from finally/early-return paths: a no-op once log_request has run,
+        otherwise the request is uncounted so it doesn't use up quota with no
+        usage record behind it.
+        """
+        user_id = self._reserved
+        if user_id is None:
+            return
+        self._reserved = None
+        
+        redis_client = get_redis()
+        if not redis_client:
+            return
+        
+        try:
+            if TTSLimiter._adjust_counters_script is None:
+                TTSLimiter._adjust_counters_script = redis_client.register_script(ADJUST_COUNTERS_SCRIPT)
+            keys = self._counter_keys(user_id)
+            TTSLimiter._adjust_counters_script(
+                keys=[keys['daily_requests'], keys['monthly_requests']],
+                args=[-1]
+            )
+        except Exception as e:
+            current_app.logger.warning(f"TTS LIMITER: Failed to release reservation: {str(e)}")
     
     def get_usage_summary(self, user_id):
         """Get user's current usage summary"""
+        snapshot = self._get_usage_snapshot(user_id)
         return {
             'daily': {
-                'requests': TTSUsage.get_user_usage_today(user_id),
+                'requests': snapshot['daily_requests'],
                 'limit_requests': self.daily_requests
             },
             'monthly': {
-                'requests': TTSUsage.get_user_usage_this_month(user_id),
+                'requests': snapshot['monthly_requests'],
                 'limit_requests': self.monthly_requests
             },
             'tier': self.user_tier
-        }
\ No newline at end of file
+        }
+    
+    def _counter_keys(self, user_id):
+        """Redis counter keys for the current day/month"""
+        now = datetime.utcnow()
+        return {
+            'daily_requests': f"tts:req:day:{user_id}:{now:%Y%m%d}",
+            'monthly_requests': f"tts:req:month:{user_id}:{now:%Y%m}"
+        }
+    
+    def _counter_expiry(self):
+        """Unix timestamps at which the current day/month counters expire"""
+        start_of_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        end_of_day = start_of_day + timedelta(days=1)
+        days_in_month = calendar.monthrange(start_of_day.year, start_of_day.month)[1]
+        end_of_month = start_of_day.replace(day=1) + timedelta(days=days_in_month)
+        return {
+            'daily_requests': calendar.timegm(end_of_day.timetuple()) + self.COUNTER_EXPIRY_GRACE,
+            'monthly_requests': calendar.timegm(end_of_month.timetuple()) + self.COUNTER_EXPIRY_GRACE
+        }
+    
+    def _get_usage_snapshot(self, user_id):
+        """
+        Get usage counters from Redis, falling back to the database
+        
+        Missing day/month counters (new period, Redis restart) are seeded from the
+        database so Redis never under-counts usage logged before it was populated.
+        """
+        redis_client = get_redis()
+        if redis_client:
+            try:
+                keys = self._counter_keys(user_id)
+                values = dict(zip(keys, redis_client.mget(list(keys.values()))))
+                
+                if values['daily_requests'] is not None and values['monthly_requests'] is not None:
+                    return {name: int(value or 0) for name, value in values.items()}
+                
+                snapshot = TTSUsage.get_limit_snapshot(user_id)
+                expiry = self._counter_expiry()
+                pipe = redis_client.pipeline()
+                pipe.set(keys['daily_requests'], snapshot['daily_requests'], nx=True, exat=expiry['daily_requests'])
+                pipe.set(keys['monthly_requests'], snapshot['monthly_requests'], nx=True, exat=expiry['monthly_requests'])
+                pipe.execute()
+                return snapshot
+            except Exception as e:
+                current_app.logger.warning(f"TTS LIMITER: Redis unavailable, using database counters: {str(e)}")
+        
+        return TTSUsage.get_limit_snapshot(user_id)
+    
+    def _increment_counters(self, user_id, success, release=None):
+        """
+        Mirror a logged request into the Redis counters
+        
+        Args:
+            release: For requests reserved by check_limits - True undoes the
+                reservation, False leaves it counted. None counts the request now.
+        """
+        # Only successful requests count towards daily/monthly limits
+        delta = -1 if release else 1 if (release is None and success) else 0
+        if not delta:
+            return
+        
+        redis_client = get_redis()
+        if not redis_client:
+            return
+        
+        try:
+            if TTSLimiter._adjust_counters_script is None:
+                TTSLimiter._adjust_counters_script = redis_client.register_script(ADJUST_COUNTERS_SCRIPT)
+            keys = self._counter_keys(user_id)
+            # Missing counters are left alone - the next check seeds them from the database
+            TTSLimiter._adjust_counters_script(
+                keys=[keys['daily_requests'], keys['monthly_requests']],
+                args=[delta]
+            )
+        except Exception as e:
+            current_app.logger.warning(f"TTS LIMITER: Failed to update Redis counters: {str(e)}")
+    
+    def _reserve_request(self, user_id, daily_limit, monthly_limit):
+        """
+        Atomically count request against daily/monthly limits in Redis
+        
+        Returns:
+            int: 1 if reserved, 0 if over the daily limit, -1 if over the monthly
+            limit, or None when Redis is unavailable or the counters are not
+            seeded yet (counted at log time instead)
+        """
+        redis_client = get_redis()
+        if not redis_client:
+            return None
+        
+        try:
+            if TTSLimiter._reserve_script is None:
+                TTSLimiter._reserve_script = redis_client.register_script(RESERVE_SCRIPT)
+            keys = self._counter_keys(user_id)
+            expiry = self._counter_expiry()
+            result = int(TTSLimiter._reserve_script(
+                keys=[keys['daily_requests'], keys['monthly_requests']],
+                args=[daily_limit, monthly_limit, expiry['daily_requests'], expiry['monthly_requests']]
+            ))
+            if result == 2:
+                return None
+            if result == 1:
+                self._reserved = user_id
+            return result
+        except Exception as e:
+            current_app.logger.warning(f"TTS LIMITER: Request reservation failed: {str(e)}")
+            return None
+    
+    def _check_rate_limit(self, user_id):
+        """
+        Check and record request against the sliding-window rate limit
+        
+        Returns:
+            bool: False if the user is over the limit; True otherwise, including
+            when the limit is disabled or Redis is unavailable (no database
+            fallback for rate limiting)
+        """
+        if self.rate_limit_requests <= 0:
+            return True
+        
+        redis_client = get_redis()
+        if not redis_client:
+            return True
+        
+        try:
+            if TTSLimiter._rate_limit_script is None:
+                TTSLimiter._rate_limit_script = redis_client.register_script(RATE_LIMIT_SCRIPT)
+            allowed = TTSLimiter._rate_limit_script(
+                keys=[f"tts:rl:{user_id}"],
+                args=[time.time(), self.RATE_LIMIT_WINDOW, self.rate_limit_requests, uuid.uuid4().hex]
+            )
+            return bool(allowed)
+        except Exception as e:
+            current_app.logger.warning(f"TTS LIMITER: Rate limit check failed: {str(e)}")
+            return True
+    
+    def _check_burst(self, user_id):
+        """
+        Check and count request against the fixed-window burst limit
+        
+        Returns:
+            bool: False if the user is over the limit; True otherwise, including
+            when Redis is unavailable
+        """
+        redis_client = get_redis()
+        if not redis_client:
+            return True
+        
+        try:
+            # Window number is part of the key, so each window starts a fresh counter
+            key = f"tts:rate:{user_id}:{int(time.time()) // self.BURST_WINDOW}"
+            pipe = redis_client.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, self.BURST_WINDOW)
+            count, _ = pipe.execute()
+            return count <= self.BURST_REQUESTS
+        except Exception as e:
+            current_app.logger.warning(f"TTS LIMITER: Burst check failed: {str(e)}")
+            return True
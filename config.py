@@ -3,6 +3,27 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _gevent_patched():
+    """Check whether gevent has monkey-patched sockets (gunicorn gevent worker)"""
+    try:
+        from gevent import monkey
+        return monkey.is_module_patched('socket')
+    except ImportError:
+        return False
+
+
+# Prefer the C-based mysqlclient driver, fall back to pure-Python PyMySQL.
+# mysqlclient does its socket I/O in C and would block the whole gevent hub,
+# so stick with PyMySQL (which gevent can patch) when running under gevent.
+MYSQL_DRIVER = 'pymysql'
+if not _gevent_patched():
+    try:
+        import MySQLdb  # noqa: F401
+        MYSQL_DRIVER = 'mysqldb'
+    except ImportError:
+        pass
+
 class Config:
     # Environment
     FLASK_ENV = os.environ.get('FLASK_ENV', 'development')
@@ -21,10 +42,20 @@ class Config:
     db_name = os.environ.get('DB_NAME', 'py_donalert')
     
     SQLALCHEMY_DATABASE_URI = (
-        f"mysql+pymysql://{db_user}:{db_password}"
+        f"mysql+{MYSQL_DRIVER}://{db_user}:{db_password}"
         f"@{db_host}/{db_name}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 20)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_pre_ping': True,
+        'pool_recycle': 280,  # Below MySQL wait_timeout so idle connections are never stale
+        'query_cache_size': 1200  # Room for every distinct statement shape without evictions
+    }
+    
+    # Redis configuration (optional - shared caches, counters and Socket.IO message queue across workers)
+    REDIS_URL = os.environ.get('REDIS_URL')
     
     # File upload configuration
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'app/static/uploads')
@@ -55,6 +86,9 @@ class Config:
         'formatters': {
             'detailed': {
                 'format': '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+            },
+            'json': {
+                '()': 'app.utils.log_formatters.JSONFormatter'
             }
         },
         'handlers': {
@@ -67,19 +101,19 @@ class Config:
                 'level': 'INFO',
                 'class': 'logging.FileHandler',
                 'filename': 'logs/app.log',
-                'formatter': 'detailed'
+                'formatter': 'json'
             },
             'marathon': {
                 'level': 'INFO',
                 'class': 'logging.FileHandler',
                 'filename': 'logs/marathon.log',
-                'formatter': 'detailed'
+                'formatter': 'json'
             },
             'donation': {
                 'level': 'INFO',
                 'class': 'logging.FileHandler',
                 'filename': 'logs/donation.log',
-                'formatter': 'detailed'
+                'formatter': 'json'
             }
         },
         'loggers': {
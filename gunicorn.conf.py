@@ -18,4 +18,13 @@ pidfile = f"{PROJECT_PATH}/gunicorn.pid"
 accesslog = f"{PROJECT_PATH}/logs/gunicorn_access.log"
 errorlog = f"{PROJECT_PATH}/logs/gunicorn_error.log"
 loglevel = "info"
-capture_output = True
\ No newline at end of file
+capture_output = True
+
+
+def post_fork(server, worker):
+    """Give each forked worker its own DB pool and log writer threads instead of the master's"""
+    from app import restart_log_listeners
+    from app.extensions import db
+    restart_log_listeners()
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
@@ -5,7 +5,7 @@ Run this script after Phase 1 database migration is complete.
 """
 
 import os
-import json
+import orjson
 from app import create_app
 from app.extensions import db
 from app.models.sound_effect import SoundEffect
@@ -49,12 +49,15 @@ SOUND_EFFECTS = [
     }
 ]
 
-def get_file_size(filename):
-    """Get file size in bytes"""
-    filepath = os.path.join('app', 'static', 'assets', 'sound_effects', filename)
-    if os.path.exists(filepath):
-        return os.path.getsize(filepath)
-    return 0
+SOUND_EFFECTS_DIR = os.path.join('app', 'static', 'assets', 'sound_effects')
+
+def get_file_sizes():
+    """Get file sizes in bytes for every sound file, keyed by filename"""
+    try:
+        with os.scandir(SOUND_EFFECTS_DIR) as entries:
+            return {entry.name: entry.stat().st_size for entry in entries if entry.is_file()}
+    except FileNotFoundError:
+        return {}
 
 def populate_sound_effects():
     """Populate the sound_effects table with sample data"""
@@ -64,40 +67,42 @@ def populate_sound_effects():
         print("🎵 Populating sound effects database...")
         
         # Check if sound effects already exist
-        existing_count = SoundEffect.query.count()
-        if existing_count > 0:
-            print(f"⚠️  Found {existing_count} existing sound effects. Skipping population.")
+        if db.session.query(SoundEffect.query.exists()).scalar():
+            print("⚠️  Found existing sound effects. Skipping population.")
             return
         
-        # Add each sound effect
+        # Build rows for a single bulk insert
+        rows = []
+        file_sizes = get_file_sizes()
         for sound_data in SOUND_EFFECTS:
             # Get actual file size
-            file_size = get_file_size(sound_data['filename'])
+            file_size = file_sizes.get(sound_data['filename'], 0)
             
             if file_size == 0:
                 print(f"❌ File not found: {sound_data['filename']}")
                 continue
             
-            # Create sound effect record
-            sound_effect = SoundEffect(
-                name=sound_data['name'],
-                filename=sound_data['filename'],
-                duration_seconds=sound_data['duration_seconds'],
-                file_size=file_size,
-                category=sound_data['category'],
-                tags=json.dumps(sound_data['tags']),
-                is_active=True
-            )
-            
-            db.session.add(sound_effect)
+            # Create sound effect row
+            rows.append({
+                'name': sound_data['name'],
+                'filename': sound_data['filename'],
+                'duration_seconds': sound_data['duration_seconds'],
+                'file_size': file_size,
+                'category': sound_data['category'],
+                'tags': orjson.dumps(sound_data['tags']).decode(),
+                'is_active': True
+            })
             print(f"✅ Added: {sound_data['name']} ({sound_data['filename']}) - {file_size} bytes")
         
-        # Commit all changes
+        # Insert and commit all rows at once
+        db.session.bulk_insert_mappings(SoundEffect, rows)
         db.session.commit()
         
         # Verify results
-        total_sounds = SoundEffect.query.count()
-        active_sounds = SoundEffect.query.filter_by(is_active=True).count()
+        total_sounds, active_sounds = db.session.query(
+            db.func.count(SoundEffect.id),
+            db.func.sum(db.case((SoundEffect.is_active == True, 1), else_=0))
+        ).one()
         categories = SoundEffect.get_categories()
         
         print(f"\n🎉 Successfully populated sound effects database!")
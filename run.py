@@ -1,7 +1,14 @@
+# Patch with gevent before anything else so the dev server matches the
+# gunicorn gevent worker (Socket.IO runs with async_mode='gevent').
+# Use this entry point for the debugger; scripts/run_dev.sh serves the app
+# through the production gunicorn config.
+from gevent import monkey
+monkey.patch_all()
+
 from app import create_app
 from app.extensions import socketio
 
 app = create_app()
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5014, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    socketio.run(app, debug=True, host='0.0.0.0', port=5014)
\ No newline at end of file
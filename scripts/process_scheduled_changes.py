@@ -15,6 +15,8 @@ import argparse
 import logging
 from datetime import datetime
 
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 # Add the project root to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -22,6 +24,9 @@ from app import create_app
 from app.models.subscription import Subscription
 from app.extensions import db
 
+# Rows fetched per round-trip when streaming subscriptions
+STREAM_BATCH_SIZE = 500
+
 def setup_logging(verbose=False):
     """Setup logging configuration"""
     log_level = logging.DEBUG if verbose else logging.INFO
@@ -74,22 +79,26 @@ def process_scheduled_changes(dry_run=False):
             from app.models.subscription import SubscriptionStatus
             current_time = datetime.utcnow()
             
-            subscriptions_due = Subscription.query.filter(
+            subscriptions_due = Subscription.query.options(
+                joinedload(Subscription.user)
+            ).filter(
                 Subscription.scheduled_change_date.isnot(None),
                 Subscription.scheduled_change_date <= current_time,
                 Subscription.status == SubscriptionStatus.ACTIVE
-            ).all()
-            
-            logger.info(f"DRY RUN: Found {len(subscriptions_due)} scheduled changes to process")
+            ).yield_per(STREAM_BATCH_SIZE)
             
+            due_count = 0
             for subscription in subscriptions_due:
                 user = subscription.user
                 logger.info(f"DRY RUN: Would process user {user.id} ({user.email}) - "
                            f"Change from {subscription.feature_tier.value if subscription.feature_tier else 'unknown'} "
                            f"to {subscription.scheduled_tier_change.value} "
                            f"scheduled for {subscription.scheduled_change_date}")
+                due_count += 1
             
-            return len(subscriptions_due)
+            logger.info(f"DRY RUN: Found {due_count} scheduled changes to process")
+            
+            return due_count
         else:
             logger.info(f"Successfully processed {changes_processed} scheduled changes")
             return changes_processed
@@ -110,12 +119,14 @@ def send_upcoming_change_warnings():
         warning_date = datetime.utcnow() + timedelta(days=3)
         warning_start = datetime.utcnow() + timedelta(days=2, hours=23)  # 3 days minus 1 hour window
         
-        upcoming_changes = Subscription.query.filter(
+        upcoming_changes = Subscription.query.options(
+            joinedload(Subscription.user)
+        ).filter(
             Subscription.scheduled_change_date.isnot(None),
             Subscription.scheduled_change_date >= warning_start,
             Subscription.scheduled_change_date <= warning_date,
             Subscription.status == SubscriptionStatus.ACTIVE
-        ).all()
+        ).yield_per(STREAM_BATCH_SIZE)
         
         warnings_sent = 0
         for subscription in upcoming_changes:
@@ -143,27 +154,29 @@ def check_system_health():
     logger.info("Performing system health checks")
     
     try:
-        # Check database connectivity
-        db.session.execute("SELECT 1")
-        logger.debug("Database connectivity: OK")
-        
-        # Check for orphaned pending subscriptions (older than 1 day)
         from app.models.subscription import SubscriptionStatus
         from datetime import timedelta
         
-        old_pending = Subscription.query.filter(
+        # Check for orphaned pending subscriptions (older than 1 day)
+        old_pending_count = select(db.func.count(Subscription.id)).where(
             Subscription.status == SubscriptionStatus.PENDING,
             Subscription.created_at < datetime.utcnow() - timedelta(days=1)
-        ).count()
-        
-        if old_pending > 0:
-            logger.warning(f"Found {old_pending} old pending subscriptions that may need cleanup")
+        ).scalar_subquery()
         
         # Check for subscriptions with scheduled changes but no pending subscription
-        orphaned_scheduled = Subscription.query.filter(
+        scheduled_count = select(db.func.count(Subscription.id)).where(
             Subscription.scheduled_change_date.isnot(None),
             Subscription.status == SubscriptionStatus.ACTIVE
-        ).count()
+        ).scalar_subquery()
+        
+        # Both counts in one round-trip; success also proves database connectivity
+        old_pending, orphaned_scheduled = db.session.execute(
+            select(old_pending_count, scheduled_count)
+        ).one()
+        logger.debug("Database connectivity: OK")
+        
+        if old_pending > 0:
+            logger.warning(f"Found {old_pending} old pending subscriptions that may need cleanup")
         
         logger.info(f"System health check complete. {orphaned_scheduled} subscriptions have scheduled changes")
         
@@ -0,0 +1,27 @@
+#!/bin/bash
+
+# DonAlert Local Server
+#
+# Serves the app through the same gunicorn gevent config used in production
+# Usage: ./scripts/run_dev.sh
+
+set -e
+
+# Get the directory where this script is located
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PROJECT_DIR="$(dirname "$SCRIPT_DIR")"
+
+# Change to project directory
+cd "$PROJECT_DIR"
+
+# Activate virtual environment if it exists
+if [ -f "venv/bin/activate" ]; then
+    source venv/bin/activate
+    echo "Activated virtual environment"
+fi
+
+# Keep pid and log files inside the checkout
+mkdir -p logs
+export PROJECT_PATH="$PROJECT_DIR"
+
+exec gunicorn -c gunicorn.conf.py wsgi:application
@@ -4,74 +4,112 @@ Sync existing donations into donor_leaderboard table.
 This addresses the historical data gap where donations existed before the leaderboard system.
 """
 
+from datetime import datetime
+
 from app import create_app
 from app.models.donation import Donation  
 from app.models.donor_leaderboard import DonorLeaderboard
 from app.extensions import db
-from sqlalchemy import func
+from sqlalchemy import delete, exists, func, literal, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 
 def sync_leaderboard_data():
-    """Sync all existing donations into donor_leaderboard table"""
+    """Sync all existing donations into donor_leaderboard table (safe to re-run)"""
+    print("🔄 Starting leaderboard sync...")
+    
+    # Group donations by streamer and donor_name only (merge guest + registered)
+    # donor_user_id stays NULL - merged entry not tied to specific registration
+    now = datetime.utcnow()
+    donation_groups = select(
+        Donation.user_id,
+        Donation.donor_name,
+        literal(None),
+        func.sum(Donation.amount),
+        func.count(Donation.id),
+        func.max(Donation.amount),
+        func.min(Donation.created_at),
+        func.max(Donation.created_at),
+        literal(now),
+        literal(now)
+    ).group_by(
+        Donation.user_id,
+        Donation.donor_name
+    )
+    
+    # Upsert aggregates over existing entries (unique_streamer_donor) and drop
+    # entries whose donations are gone, in one transaction so the table stays
+    # readable during the sync and a failure leaves the old data intact
+    print("🔁 Syncing leaderboard data from donations...")
+    upsert = mysql_insert(DonorLeaderboard).from_select([
+        'user_id',
+        'donor_name',
+        'donor_user_id',
+        'total_amount',
+        'donation_count',
+        'biggest_single_donation',
+        'first_donation_date',
+        'last_donation_date',
+        'created_at',
+        'updated_at'
+    ], donation_groups)
+    upsert = upsert.on_duplicate_key_update(
+        total_amount=upsert.inserted.total_amount,
+        donation_count=upsert.inserted.donation_count,
+        biggest_single_donation=upsert.inserted.biggest_single_donation,
+        first_donation_date=upsert.inserted.first_donation_date,
+        last_donation_date=upsert.inserted.last_donation_date,
+        updated_at=upsert.inserted.updated_at
+    )
+    stale_entries = delete(DonorLeaderboard).where(
+        ~exists().where(
+            Donation.user_id == DonorLeaderboard.user_id,
+            Donation.donor_name == DonorLeaderboard.donor_name
+        )
+    )
+    try:
+        db.session.execute(upsert)
+        db.session.execute(stale_entries)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Leaderboard sync failed, existing data kept: {e}")
+        raise
+    
+    # Upsert rowcounts mix inserts and updates, so report the resulting size once
+    entry_count = db.session.execute(
+        select(func.count()).select_from(DonorLeaderboard)
+    ).scalar()
+    print(f"🎉 Leaderboard synced: {entry_count} entries")
+    
+    # Show final stats - top 5 per streamer in one windowed query
+    print("\n📊 Final leaderboard stats:")
+    rank = func.row_number().over(
+        partition_by=DonorLeaderboard.user_id,
+        order_by=DonorLeaderboard.total_amount.desc()
+    ).label('donor_rank')
+    ranked = select(
+        DonorLeaderboard.user_id,
+        DonorLeaderboard.donor_name,
+        DonorLeaderboard.total_amount,
+        rank
+    ).subquery()
+    top_donors = db.session.execute(
+        select(ranked).where(ranked.c.donor_rank <= 5).order_by(ranked.c.user_id, ranked.c.donor_rank)
+    )
+    
+    current_user_id = None
+    for donor in top_donors:
+        if donor.user_id != current_user_id:
+            current_user_id = donor.user_id
+            print(f"\n👤 User {donor.user_id} top donors:")
+        print(f"  #{donor.donor_rank}: {donor.donor_name} - {donor.total_amount}₮")
+
+def main():
+    """Create the app once and run the sync inside its context"""
     app = create_app()
     
     with app.app_context():
-        print("🔄 Starting leaderboard sync...")
-        
-        # Clear existing leaderboard data to rebuild from scratch
-        print("🗑️  Clearing existing leaderboard data...")
-        DonorLeaderboard.query.delete()
-        db.session.commit()
-        
-        # Get all donations grouped by user and donor
-        print("📊 Analyzing existing donations...")
-        
-        # Group donations by streamer and donor_name only (merge guest + registered)
-        donation_groups = db.session.query(
-            Donation.user_id,
-            Donation.donor_name,
-            func.sum(Donation.amount).label('total_amount'),
-            func.count(Donation.id).label('donation_count'),
-            func.max(Donation.amount).label('biggest_single'),
-            func.min(Donation.created_at).label('first_donation'),
-            func.max(Donation.created_at).label('last_donation')
-        ).group_by(
-            Donation.user_id,
-            Donation.donor_name
-        ).all()
-        
-        print(f"📈 Found {len(donation_groups)} unique donor groups")
-        
-        # Create leaderboard entries
-        created_count = 0
-        for group in donation_groups:
-            entry = DonorLeaderboard(
-                user_id=group.user_id,
-                donor_name=group.donor_name,
-                donor_user_id=None,  # Merged entry - not tied to specific registration
-                total_amount=group.total_amount,
-                donation_count=group.donation_count,
-                biggest_single_donation=group.biggest_single,
-                first_donation_date=group.first_donation,
-                last_donation_date=group.last_donation
-            )
-            
-            db.session.add(entry)
-            created_count += 1
-            
-            print(f"✅ {group.donor_name}: {group.total_amount}₮ ({group.donation_count} donations)")
-        
-        # Commit all changes
-        db.session.commit()
-        print(f"🎉 Successfully created {created_count} leaderboard entries!")
-        
-        # Show final stats
-        print("\n📊 Final leaderboard stats:")
-        for user_id in db.session.query(Donation.user_id).distinct():
-            user_id = user_id[0]
-            top_donors = DonorLeaderboard.get_top_donors(user_id, limit=5)
-            print(f"\n👤 User {user_id} top donors:")
-            for i, donor in enumerate(top_donors, 1):
-                print(f"  #{i}: {donor.donor_name} - {donor.total_amount}₮")
+        sync_leaderboard_data()
 
 if __name__ == '__main__':
-    sync_leaderboard_data()
\ No newline at end of file
+    main()
\ No newline at end of file